@@ -0,0 +1,45 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Thread-safe in-memory cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        now = time.monotonic()
+        with self._lock:
+            # drop expired entries so keys that are never read again don't pile up
+            expired = [k for k, (stored_at, _) in self._entries.items() if now - stored_at > self.ttl]
+            for k in expired:
+                del self._entries[k]
+            self._entries[key] = (now, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_or_fetch(self, key, fetch):
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            self.set(key, value)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
@@ -7,8 +7,9 @@ from shotchart import shot_map
 from discord.ui import View, Button
 from playbyplay import get_play_by_play, fetch_live_games, fetch_ongoing_game_ids
 from news import fetch_feed
+from prefetch import GameNightScheduler
+from subscriptions import SubscriptionStore, stream_play_by_play, active_streams
 from discord.ext import commands 
-import schedule 
 import time
 import feedparser
 import re
@@ -29,6 +30,9 @@ SHAMS_FEED = os.getenv('DISCORD_SHAMS_TWEETS')
 FEED_URLS = ['WOJ_FEED', 'SHAMS_FEED']
 # Initialize the bot
 bot = commands.Bot(command_prefix='!', intents=discord.Intents.all(), hearbeat_timeout=60)
+game_night = GameNightScheduler()
+subscriptions = SubscriptionStore()
+background_tasks = set()  # strong references so pending tasks aren't garbage collected
 
 keep_alive()
 
@@ -55,6 +59,8 @@ class OptionsDropdown(discord.ui.Select):
         elif self.values[0] == "Play-by-play":
             ongoing_games = await fetch_ongoing_game_ids()
             if ongoing_games:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, subscriptions.add_games, ongoing_games)
                 view = LiveGamesView(ongoing_games)
                 await interaction.response.send_message("Select a game to view play-by-play details:", view=view)
             else:
@@ -184,59 +190,55 @@ class ShotChart(discord.ui.Modal, title="Shot Chart"):
 
 class LiveGamesView(discord.ui.View):
     def __init__(self, ongoing_games):
-        super().__init__()
-        self.last_action_numbers = {}
+        # persistent so the buttons keep working after a restart, see setup_hook
+        super().__init__(timeout=None)
         for game in ongoing_games:
             button = discord.ui.Button(label=f"{game['matchup']} @ {game['time']}",
                                        style=discord.ButtonStyle.primary,
                                        custom_id=f"game_{game['gameId']}")
             button.callback = self.handle_button_click
             self.add_item(button)
-            self.last_action_numbers[game['gameId']] = -1
 
     async def handle_button_click(self, interaction: discord.Interaction):
         game_id = interaction.data['custom_id'].split('_')[1]
-        last_action_number = self.last_action_numbers.get(game_id, -1)  # Initialize with -1
         await interaction.response.defer(ephemeral=True)
-
-        start_time = datetime.now()
-        game_ended = False
-
-        while True:
-            try:
-                plays, last_action_number = await get_play_by_play(game_id, last_action_number)
-                if plays:
-                    for play in reversed(plays):  # Iterate over plays in reverse order
-                        formatted_play = f"`{play['actionNumber']}` **{play['period']}:{play['clock']}** ({play['actionType']} {play['description']})"
-                        await interaction.followup.send(formatted_play)
-                    self.last_action_numbers[game_id] = last_action_number
-                elif not plays:
-                    # Check if 25 minutes have passed since the last play
-                    if (datetime.now() - start_time).total_seconds() / 60 > 25:
-                        await interaction.followup.send("No new plays in the last 25 minutes. Ending play-by-play.")
-                        break
-                else:
-                    # Check if the game has ended
-                    live_games = await fetch_live_games()
-                    for game in live_games:
-                        if game['gameId'] == game_id and game['gameStatus'] == 3:
-                            if game['homeTeam']['score'] > game['awayTeam']['score']:
-                                winner = f"{game['homeTeam']['teamName']} win"
-                            else:
-                                winner = f"{game['awayTeam']['teamName']} win"
-                            await interaction.followup.send(f"Game ended! Final score: {game['awayTeam']['score']} - {game['homeTeam']['score']}, ***{winner}***")
-                            game_ended = True
-                            break
-
-                    if game_ended:
-                        break
-
-                    await asyncio.sleep(0.1)
-
-            except Exception as e:
-                print(f"Error during interaction: {e}")
-                await interaction.followup.send(f"Error: {str(e)}")
-                break
+        stream_key = (game_id, interaction.channel_id)
+        if stream_key in active_streams:
+            await interaction.followup.send("Play-by-play for this game is already running in this channel.")
+            return
+        active_streams.add(stream_key)  # claim before awaiting so a double click can't start two streams
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, subscriptions.subscribe, game_id, interaction.channel_id)
+        except Exception:
+            active_streams.discard(stream_key)
+            raise
+        await interaction.followup.send("Starting play-by-play in this channel.")
+        # post through the channel, interaction followups expire after 15 minutes
+        await stream_play_by_play(subscriptions, game_id, interaction.channel_id, interaction.channel.send)
+
+async def resume_stream(game_id, channel_id):
+    await bot.wait_until_ready()
+    channel = bot.get_channel(channel_id)
+    if channel is None:
+        # threads and other uncached channels aren't in get_channel
+        try:
+            channel = await bot.fetch_channel(channel_id)
+        except (discord.NotFound, discord.Forbidden):
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, subscriptions.unsubscribe, game_id, channel_id)
+            return
+        except discord.HTTPException as e:
+            print(f"Error fetching channel {channel_id}, keeping its subscription: {e}")
+            return
+    print(f"Resuming play-by-play for game {game_id} in channel {channel_id}")
+    await stream_play_by_play(subscriptions, game_id, channel_id, channel.send)
+
+def start_background_task(coro):
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
                 
 class DropdownView(discord.ui.View):
     def __init__(self):
@@ -261,10 +263,25 @@ async def hi(ctx):
 
 
 
+@bot.event
+async def setup_hook():
+    # warm caches and poll live games on the day's schedule
+    game_night.start()
+    # re-register play-by-play buttons and pick up streams where they left off
+    start_background_task(subscriptions.run_flusher())
+    loop = asyncio.get_running_loop()
+    saved_games = await loop.run_in_executor(None, subscriptions.games)
+    if saved_games:
+        bot.add_view(LiveGamesView(saved_games[:25]))  # discord caps a view at 25 buttons
+    saved_subscriptions = await loop.run_in_executor(None, subscriptions.subscriptions)
+    for game_id, channel_id, _ in saved_subscriptions:
+        start_background_task(resume_stream(game_id, channel_id))
+
 @bot.event
 async def on_ready():
     print(f'Logged in as {bot.user.name}')
     
 
 bot.run(TOKEN)
+subscriptions.close()
 
@@ -8,13 +8,28 @@ from nba_api.live.nba.endpoints import playbyplay
 from nba_api.stats.static import players
 import asyncio 
 
+# game_id -> latest actions, kept fresh by the game-night live poller
+_live_actions = {}
+
+def set_live_actions(game_id, actions):
+    _live_actions[game_id] = actions
+
+def clear_live_actions(game_id):
+    _live_actions.pop(game_id, None)
+
+def is_game_end(action):
+    return action['actionType'] == 'game' and action.get('subType') == 'end'
+
+def fetch_game_actions(game_id):
+    return playbyplay.PlayByPlay(game_id).get_dict()['game']['actions']
+
 async def get_play_by_play(game_id, last_action_number=-1):
     try:
         print(f"Getting play-by-play data for game {game_id}...")
-        loop = asyncio.get_running_loop()
-        pbp = await loop.run_in_executor(None, playbyplay.PlayByPlay, game_id)
-        actions = await loop.run_in_executor(None, pbp.get_dict)
-        actions = actions['game']['actions']
+        actions = _live_actions.get(game_id)
+        if actions is None:
+            loop = asyncio.get_running_loop()
+            actions = await loop.run_in_executor(None, fetch_game_actions, game_id)
 
         # reverse order of actions, having most recent action at the top
         actions = sorted(actions, key=lambda x: x['actionNumber'], reverse=True)
@@ -32,7 +47,10 @@ async def get_play_by_play(game_id, last_action_number=-1):
                     'period': latest_action['period'],
                     'clock': latest_action['clock'],
                     'actionType': latest_action['actionType'],
-                    'description': latest_action['description']
+                    'subType': latest_action.get('subType'),
+                    'description': latest_action['description'],
+                    'scoreHome': latest_action.get('scoreHome'),
+                    'scoreAway': latest_action.get('scoreAway')
                 }
             else:
                 play_by_play_dict = {
@@ -41,7 +59,10 @@ async def get_play_by_play(game_id, last_action_number=-1):
                     'period': latest_action['period'],
                     'clock': latest_action['clock'],
                     'actionType': latest_action['actionType'],
-                    'description': latest_action['description']
+                    'subType': latest_action.get('subType'),
+                    'description': latest_action['description'],
+                    'scoreHome': latest_action.get('scoreHome'),
+                    'scoreAway': latest_action.get('scoreAway')
                 }
             last_action_number = latest_action['actionNumber']
             return [play_by_play_dict], last_action_number
@@ -51,6 +72,21 @@ async def get_play_by_play(game_id, last_action_number=-1):
         print(f"Error retrieving play-by-play data: {e}")
         return [], last_action_number
 
+async def fetch_todays_games():
+    """Returns today's scoreboard games with tip-off as a UTC datetime"""
+    loop = asyncio.get_running_loop()
+    board = await loop.run_in_executor(None, scoreboard.ScoreBoard)
+    todays_games = []
+    for game in board.games.get_dict():
+        todays_games.append({
+            "gameId": game["gameId"],
+            "gameStatus": game["gameStatus"],
+            "startTime": parser.parse(game["gameTimeUTC"]).replace(tzinfo=pytz.utc),
+            "homeTeamId": game['homeTeam']['teamId'],
+            "awayTeamId": game['awayTeam']['teamId'],
+            "matchup": f"{game['awayTeam']['teamName']} vs {game['homeTeam']['teamName']}"
+        })
+    return todays_games
     
 async def fetch_ongoing_game_ids():
     try:
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+import asyncio
+import pytz
+from playbyplay import fetch_todays_games, fetch_game_actions, set_live_actions, clear_live_actions, is_game_end
+from stats import warm_player_index, fetch_player_stats_frames, fetch_team_stats_frame, fetch_team_roster, player_stats_cache, team_stats_cache, roster_cache
+from shotchart import render_shot_chart, render_cache, shots_cache
+
+PREFETCH_LEAD = timedelta(minutes=45)  # start warming caches this long before tip-off, well inside CACHE_TTL
+REQUEST_SPACING = 1.5  # seconds between stats.nba.com calls, it throttles bursts
+SCOREBOARD_REFRESH = 30 * 60  # seconds between reads of today's games
+LIVE_POLL_INTERVAL = 3  # seconds between play-by-play polls while a game is live
+FINAL_WIND_DOWN = timedelta(minutes=10)  # keep polling after the final for late corrections
+MAX_GAME_LENGTH = timedelta(hours=4)  # stop polling even if the final is never seen
+CHART_TYPES = ('regular', 'heatmap')
+
+
+class GameNightScheduler:
+    """Warms caches before each of today's games and runs one shared live poller per game"""
+
+    def __init__(self):
+        self.game_tasks = {}
+        self.task = None
+        self._upstream_lock = asyncio.Lock()  # one game prefetches at a time
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self):
+        while True:
+            try:
+                games = await fetch_todays_games()
+            except Exception as e:
+                print(f"Error reading today's games: {e}")
+                games = []
+
+            todays_ids = {game['gameId'] for game in games}
+            for game_id, task in list(self.game_tasks.items()):
+                if game_id not in todays_ids and task.done():
+                    del self.game_tasks[game_id]
+
+            for game in games:
+                if game['gameId'] in self.game_tasks or game['gameStatus'] == 3:
+                    continue
+                self.game_tasks[game['gameId']] = asyncio.create_task(self.game_night(game))
+
+            await asyncio.sleep(SCOREBOARD_REFRESH)
+
+    async def game_night(self, game):
+        # polling runs on its own clock so a slow prefetch can't delay tip-off
+        poller = asyncio.create_task(self.poll_live_at_tip(game))
+        if game['gameStatus'] == 1:  # upcoming, warm up before tip-off
+            await sleep_until(game['startTime'] - PREFETCH_LEAD)
+            time_to_tip = (game['startTime'] - datetime.now(tz=pytz.utc)).total_seconds()
+            if time_to_tip > 0:
+                try:
+                    await asyncio.wait_for(self.prefetch(game), timeout=time_to_tip)
+                except asyncio.TimeoutError:
+                    print(f"Prefetch for {game['matchup']} ran into tip-off, stopping it")
+                except Exception as e:
+                    print(f"Error prefetching {game['matchup']}: {e}")
+        await poller
+
+    async def poll_live_at_tip(self, game):
+        await sleep_until(game['startTime'])
+        await self.poll_live(game)
+
+    async def prefetch(self, game):
+        print(f"Prefetching {game['matchup']}...")
+        async with self._upstream_lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, warm_player_index)
+            for team_id in (game['awayTeamId'], game['homeTeamId']):
+                await self._warm(team_stats_cache, team_id, fetch_team_stats_frame, team_id)
+                roster = await self._warm(roster_cache, team_id, fetch_team_roster, team_id)
+                for player in roster or []:
+                    await self._warm(player_stats_cache, player['id'], fetch_player_stats_frames, player['id'])
+                    for chart_type in CHART_TYPES:
+                        await self._warm(render_cache, (player['id'], chart_type), render_shot_chart, player['id'], chart_type)
+        print(f"Finished prefetching {game['matchup']}")
+
+    async def _warm(self, cache, key, fetch, *args):
+        if key in cache:
+            return cache.get(key)
+        loop = asyncio.get_running_loop()
+        try:
+            value = await loop.run_in_executor(None, fetch, *args)
+        except Exception as e:
+            print(f"Error prefetching {fetch.__name__}{args}: {e}")
+            value = None
+        await asyncio.sleep(REQUEST_SPACING)
+        return value
+
+    async def poll_live(self, game):
+        game_id = game['gameId']
+        loop = asyncio.get_running_loop()
+        final_at = None
+        print(f"Starting live polling for {game['matchup']}")
+        try:
+            while datetime.now(tz=pytz.utc) < game['startTime'] + MAX_GAME_LENGTH:
+                try:
+                    actions = await loop.run_in_executor(None, fetch_game_actions, game_id)
+                    set_live_actions(game_id, actions)
+                    if final_at is None and actions and is_game_end(actions[-1]):
+                        final_at = datetime.now(tz=pytz.utc)
+                        print(f"{game['matchup']} is final, winding down live polling")
+                        self.evict_game(game)
+                except Exception as e:
+                    print(f"Error polling play-by-play for game {game_id}: {e}")
+
+                if final_at is not None and datetime.now(tz=pytz.utc) - final_at > FINAL_WIND_DOWN:
+                    break
+                await asyncio.sleep(LIVE_POLL_INTERVAL)
+        finally:
+            clear_live_actions(game_id)
+            # evict again, stats.nba.com can lag the final by a few minutes
+            self.evict_game(game)
+            print(f"Stopped live polling for {game['matchup']}")
+
+    def evict_game(self, game):
+        """Drops cached stats and charts for both teams so post-game lookups are fresh"""
+        for team_id in (game['awayTeamId'], game['homeTeamId']):
+            team_stats_cache.delete(team_id)
+            for player in roster_cache.get(team_id) or []:
+                player_stats_cache.delete(player['id'])
+                shots_cache.delete(player['id'])
+                for chart_type in CHART_TYPES:
+                    render_cache.delete((player['id'], chart_type))
+
+
+async def sleep_until(when):
+    delay = (when - datetime.now(tz=pytz.utc)).total_seconds()
+    if delay > 0:
+        await asyncio.sleep(delay)
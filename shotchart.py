@@ -1,3 +1,5 @@
+import matplotlib
+matplotlib.use('Agg')  # charts are rendered off the main thread
 import matplotlib.pyplot as plt
 from matplotlib.patches import Circle, Rectangle, Arc
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
@@ -9,10 +11,18 @@ import numpy as np
 import seaborn as sns
 import tempfile
 import os
+import asyncio
+import threading
+from cache import TTLCache
+from stats import find_player, CACHE_TTL
 
 current_year = dt.datetime.now().year
 if dt.datetime.now().month < 10:
     current_year = current_year - 1
+
+shots_cache = TTLCache(CACHE_TTL)
+render_cache = TTLCache(CACHE_TTL)
+_render_lock = threading.Lock()  # pyplot keeps global state, render one chart at a time
     
     
 def draw_court(ax=None, color='black', lw=2, outer_lines=False):
@@ -64,57 +74,73 @@ def draw_court(ax=None, color='black', lw=2, outer_lines=False):
     return ax
 
 async def get_player_id(player_name):
-    normalized_input_name = player_name.strip().lower()
-    player_dict = players.get_players()
-    player = [p for p in player_dict if p['full_name'].lower() == normalized_input_name]
+    player = find_player(player_name)
     if not player:
-        parts = normalized_input_name.split()
-        normalized_input_name = ', '.join(parts[::-1])
-        player = [p for p in player_dict if p['full_name'].lower() == normalized_input_name]
+        player = find_player(', '.join(player_name.strip().lower().split()[::-1]))
     if player:
-        return player[0]['id']
+        return player['id']
     return "Player not found."
 
+def fetch_shots(player_id):
+    """Returns a player's field goal attempts, cached for CACHE_TTL"""
+    def fetch():
+        shot_chart = shotchartdetail.ShotChartDetail(
+            team_id=0,
+            player_id=player_id,
+            context_measure_simple='FGA'
+        )
+        return shot_chart.get_data_frames()[0]
+    return shots_cache.get_or_fetch(player_id, fetch)
+
+def render_shot_chart(player_id, chart_type='regular'):
+    """Renders a player's shot chart to PNG bytes, cached per player and chart type"""
+    def render():
+        shots = fetch_shots(player_id)
+        player_name = players.find_player_by_id(player_id)['full_name']
+
+        with _render_lock:
+            fig, ax = plt.subplots(figsize=(12, 11))
+            draw_court(ax, outer_lines=True)
+
+            if chart_type == 'regular':
+                ax.scatter(shots.LOC_X, shots.LOC_Y, alpha=0.5, c='blue', marker='o', edgecolors='black', s=100)
+            elif chart_type == 'heatmap':
+                sns.kdeplot(x=shots.LOC_X, y=shots.LOC_Y, fill=True, alpha=0.5, cmap="YlOrRd", bw_adjust=0.5, ax=ax)
+                draw_court(ax, color="black", lw=1, outer_lines=True)
+
+            # limits
+            ax.set_xlim(-250, 250)
+            ax.set_ylim(-47.5, 422.5)
+
+            # Remove unwanted axes/labels
+            ax.set_xlabel('')
+            ax.set_ylabel('')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            for spine in ax.spines.values():
+                spine.set_visible(False)
+
+            ax.set_title(f"{player_name.upper()} Shotchart {current_year}-{current_year+1}", fontsize=20)
+            ax.set_facecolor('#eeeeee')
+            ax.set_aspect('equal')
+
+            buffer = BytesIO()
+            fig.savefig(buffer, format='png', bbox_inches='tight')
+            plt.close(fig)
+        return buffer.getvalue()
+    return render_cache.get_or_fetch((player_id, chart_type), render)
+
 async def shot_map(player_name, chart_type='regular'):
     player_id = await get_player_id(player_name)
     if isinstance(player_id, str):  
         return None, player_id
 
-    shot_chart = shotchartdetail.ShotChartDetail(
-        team_id=0,
-        player_id=player_id,
-        context_measure_simple='FGA'
-    )
-    shots = shot_chart.get_data_frames()[0]
-
-    fig, ax = plt.subplots(figsize=(12, 11))
-    draw_court(ax, outer_lines=True)
-
-    if chart_type == 'regular':
-        ax.scatter(shots.LOC_X, shots.LOC_Y, alpha=0.5, c='blue', marker='o', edgecolors='black', s=100)
-    elif chart_type == 'heatmap':
-        sns.kdeplot(x=shots.LOC_X, y=shots.LOC_Y, fill=True, alpha=0.5, cmap="YlOrRd", bw_adjust=0.5, ax=ax)
-        draw_court(ax, color="black", lw=1, outer_lines=True)
-
-    # limits
-    ax.set_xlim(-250, 250)
-    ax.set_ylim(-47.5, 422.5)
-
-    # Remove unwanted axes/labels
-    ax.set_xlabel('')
-    ax.set_ylabel('')
-    ax.set_xticks([])
-    ax.set_yticks([])
-    for spine in ax.spines.values():
-        spine.set_visible(False)
-
-    ax.set_title(f"{player_name.upper()} Shotchart {current_year}-{current_year+1}", fontsize=20)
-    ax.set_facecolor('#eeeeee')
-    ax.set_aspect('equal')
+    loop = asyncio.get_running_loop()
+    image = await loop.run_in_executor(None, render_shot_chart, player_id, chart_type)
 
     temp_dir = tempfile.mkdtemp()
     file_path = os.path.join(temp_dir, 'shot_chart.png')
-    plt.savefig(file_path, bbox_inches='tight')
-    plt.close(fig)
+    with open(file_path, 'wb') as f:
+        f.write(image)
     
-    return file_path, None
\ No newline at end of file
+    return file_path, None
@@ -1,30 +1,71 @@
 import discord
 from nba_api.stats.static import players
 from nba_api.stats.static import teams
-from nba_api.stats.endpoints import playercareerstats, playerdashboardbyyearoveryear, teamgamelog, teamdashboardbygeneralsplits, teamdashboardbyshootingsplits
+from nba_api.stats.endpoints import playercareerstats, playerdashboardbyyearoveryear, teamgamelog, teamdashboardbygeneralsplits, teamdashboardbyshootingsplits, commonteamroster
 import datetime as dt
 import pandas as pd
 import asyncio
 import time
 from discord.ext import commands
+from cache import TTLCache
 current_year = dt.datetime.now().year
 if dt.datetime.now().month < 10:
     current_year = current_year - 1
 
-async def get_player_stats(player_name):
-    # Find player by name
-    player_dict = players.get_players()
-    player = [p for p in player_dict if p['full_name'].lower() == player_name.lower()]
-    if player:
-        player_id = player[0]['id']
-        career = playercareerstats.PlayerCareerStats(player_id=player_id)
-        career_df = career.get_data_frames()[0]
+CACHE_TTL = 4 * 60 * 60  # season stats only change once a game goes final, outlives the prefetch lead
+ROSTER_TTL = 6 * 60 * 60
+
+_player_index = {}
+player_stats_cache = TTLCache(CACHE_TTL)
+team_stats_cache = TTLCache(CACHE_TTL)
+roster_cache = TTLCache(ROSTER_TTL)
 
+def warm_player_index():
+    """Builds the lowercase name -> player lookup used by find_player"""
+    global _player_index
+    if not _player_index:
+        index = {}
+        for p in players.get_players():
+            index.setdefault(p['full_name'].lower(), p)  # first match wins on shared names
+        _player_index = index  # publish in one step, readers never see a half-built index
+    return _player_index
+
+def find_player(player_name):
+    return warm_player_index().get(player_name.strip().lower())
+
+def fetch_player_stats_frames(player_id):
+    """Returns (career_df, advanced_df) for a player, cached for CACHE_TTL"""
+    def fetch():
+        career = playercareerstats.PlayerCareerStats(player_id=player_id)
         # Fetch advanced stats
         advanced_stats = playerdashboardbyyearoveryear.PlayerDashboardByYearOverYear(player_id=player_id)
-        advanced_df = advanced_stats.get_data_frames()[1]
+        time.sleep(0.600)
+        return career.get_data_frames()[0], advanced_stats.get_data_frames()[1]
+    return player_stats_cache.get_or_fetch(player_id, fetch)
 
+def fetch_team_stats_frame(team_id):
+    """Returns the seasonal dashboard frame for a team, cached for CACHE_TTL"""
+    def fetch():
+        team_stats = teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits(team_id=team_id)
         time.sleep(0.600)
+        return team_stats.get_data_frames()[0]  # Assuming first DataFrame contains seasonal stats
+    return team_stats_cache.get_or_fetch(team_id, fetch)
+
+def fetch_team_roster(team_id):
+    """Returns the current roster of a team as a list of {'id', 'name'} dicts"""
+    def fetch():
+        roster_df = commonteamroster.CommonTeamRoster(team_id=team_id).get_data_frames()[0]
+        return [{'id': row['PLAYER_ID'], 'name': row['PLAYER']} for _, row in roster_df.iterrows()]
+    return roster_cache.get_or_fetch(team_id, fetch)
+
+async def get_player_stats(player_name):
+    # Find player by name
+    player = find_player(player_name)
+    if player:
+        player_id = player['id']
+        loop = asyncio.get_running_loop()
+        career_df, advanced_df = await loop.run_in_executor(None, fetch_player_stats_frames, player_id)
+
         latest_season_reg = career_df.iloc[-1]
         latest_season_advanced = advanced_df.iloc[-1]
 
@@ -77,12 +118,8 @@ async def get_team_stats(team_name):
     if team:
         team_id = team[0]['id']
         # Fetch team dashboard stats
-        team_stats = teamdashboardbygeneralsplits.TeamDashboardByGeneralSplits(team_id=team_id)
-        team_ranks = teamdashboardbyshootingsplits.TeamDashboardByShootingSplits(team_id=team_id)
-        
-        time.sleep(0.600)
-        team_df = team_stats.get_data_frames()[0]  # Assuming first DataFrame contains seasonal stats
-       # other_df = team_ranks.get_data_frames()[0]
+        loop = asyncio.get_running_loop()
+        team_df = await loop.run_in_executor(None, fetch_team_stats_frame, team_id)
         
         stats = {
             "Wins": team_df['W'][0],
@@ -0,0 +1,170 @@
+import sqlite3
+import threading
+import asyncio
+import time
+import os
+from datetime import datetime
+from playbyplay import get_play_by_play, is_game_end
+
+DB_PATH = os.getenv('SUBSCRIPTIONS_DB', 'subscriptions.db')
+FLUSH_INTERVAL = 1  # seconds between batched cursor writes
+GAME_RETENTION = 24 * 60 * 60  # offered games are re-registered for a day
+
+
+class SubscriptionStore:
+    """SQLite (WAL) store for play-by-play subscriptions and their per-game cursors.
+
+    Subscribe/unsubscribe are written straight through, callers run them in an
+    executor. Cursor updates happen on every play, so they only touch an
+    in-memory dict and are flushed in batches by run_flusher() off the event loop.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._pending_cursors = {}
+        self._pending_lock = threading.Lock()  # guards _pending_cursors, never held during I/O
+        self._conn_lock = threading.Lock()  # guards the sqlite connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn_lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS games ("
+                "game_id TEXT PRIMARY KEY, matchup TEXT, time TEXT, added_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS subscriptions ("
+                "game_id TEXT, channel_id INTEGER, last_action_number INTEGER, "
+                "PRIMARY KEY (game_id, channel_id))"
+            )
+
+    def add_games(self, games):
+        now = time.time()
+        with self._conn_lock, self._conn:
+            self._conn.execute("DELETE FROM games WHERE added_at <= ?", (now - GAME_RETENTION,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?)",
+                [(game['gameId'], game['matchup'], game['time'], now) for game in games]
+            )
+
+    def games(self):
+        """Returns the games offered in the last GAME_RETENTION seconds"""
+        with self._conn_lock:
+            rows = self._conn.execute(
+                "SELECT game_id, matchup, time FROM games WHERE added_at > ? ORDER BY added_at DESC",
+                (time.time() - GAME_RETENTION,)
+            ).fetchall()
+        return [{'gameId': game_id, 'matchup': matchup, 'time': game_time} for game_id, matchup, game_time in rows]
+
+    def subscribe(self, game_id, channel_id, last_action_number=-1):
+        with self._conn_lock, self._conn:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO subscriptions VALUES (?, ?, ?)",
+                (game_id, channel_id, last_action_number)
+            )
+
+    def unsubscribe(self, game_id, channel_id):
+        with self._pending_lock:
+            self._pending_cursors.pop((game_id, channel_id), None)
+        with self._conn_lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM subscriptions WHERE game_id = ? AND channel_id = ?",
+                (game_id, channel_id)
+            )
+
+    def cursor(self, game_id, channel_id):
+        with self._pending_lock:
+            pending = self._pending_cursors.get((game_id, channel_id))
+        if pending is not None:
+            return pending
+        with self._conn_lock:
+            row = self._conn.execute(
+                "SELECT last_action_number FROM subscriptions WHERE game_id = ? AND channel_id = ?",
+                (game_id, channel_id)
+            ).fetchone()
+        return row[0] if row else -1
+
+    def subscriptions(self):
+        """Returns (game_id, channel_id, last_action_number) for every saved subscription"""
+        self.flush()
+        with self._conn_lock:
+            return self._conn.execute(
+                "SELECT game_id, channel_id, last_action_number FROM subscriptions"
+            ).fetchall()
+
+    def update_cursor(self, game_id, channel_id, last_action_number):
+        with self._pending_lock:
+            self._pending_cursors[(game_id, channel_id)] = last_action_number
+
+    def flush(self):
+        with self._pending_lock:
+            if not self._pending_cursors:
+                return
+            pending, self._pending_cursors = self._pending_cursors, {}
+        with self._conn_lock, self._conn:
+            self._conn.executemany(
+                "UPDATE subscriptions SET last_action_number = ? WHERE game_id = ? AND channel_id = ?",
+                [(number, game_id, channel_id) for (game_id, channel_id), number in pending.items()]
+            )
+
+    async def run_flusher(self, interval=FLUSH_INTERVAL):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await loop.run_in_executor(None, self.flush)
+            except Exception as e:
+                print(f"Error saving play-by-play cursors: {e}")
+
+    def close(self):
+        self.flush()
+        with self._conn_lock:
+            self._conn.close()
+
+
+# (game_id, channel_id) pairs with a running stream
+active_streams = set()
+
+async def stream_play_by_play(store, game_id, channel_id, send):
+    """Posts new plays for a game until it ends, saving the cursor so a restart can resume"""
+    loop = asyncio.get_running_loop()
+    active_streams.add((game_id, channel_id))
+    last_action_number = await loop.run_in_executor(None, store.cursor, game_id, channel_id)
+    start_time = datetime.now()
+    finished = False  # game over or idle timeout, anything else keeps the subscription
+
+    try:
+        while True:
+            try:
+                plays, last_action_number = await get_play_by_play(game_id, last_action_number)
+                if plays:
+                    for play in reversed(plays):  # Iterate over plays in reverse order
+                        formatted_play = f"`{play['actionNumber']}` **{play['period']}:{play['clock']}** ({play['actionType']} {play['description']})"
+                        await send(formatted_play)
+                    store.update_cursor(game_id, channel_id, last_action_number)
+                    start_time = datetime.now()
+                    final = next((play for play in plays if is_game_end(play)), None)
+                    if final is not None:
+                        await send(f"Game ended! Final score: {final['scoreAway']} - {final['scoreHome']}")
+                        finished = True
+                        break
+                else:
+                    # Check if 25 minutes have passed since the last play
+                    if (datetime.now() - start_time).total_seconds() / 60 > 25:
+                        await send("No new plays in the last 25 minutes. Ending play-by-play.")
+                        finished = True
+                        break
+                    await asyncio.sleep(1)
+
+            except Exception as e:
+                print(f"Error during interaction: {e}")
+                try:
+                    await send(f"Error: {str(e)}")
+                except Exception:
+                    pass
+                break
+    finally:
+        active_streams.discard((game_id, channel_id))
+
+    if finished:
+        await loop.run_in_executor(None, store.unsubscribe, game_id, channel_id)
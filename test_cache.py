@@ -0,0 +1,45 @@
+import time
+
+from cache import TTLCache
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(ttl=60)
+    cache.set('lebron', 1)
+    assert cache.get('lebron') == 1
+    now[0] += 61
+    assert cache.get('lebron') is None
+    assert 'lebron' not in cache
+
+
+def test_set_evicts_expired_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: now[0])
+    cache = TTLCache(ttl=60)
+    cache.set('old', 1)
+    now[0] += 61
+    cache.set('new', 2)
+    assert list(cache._entries) == ['new']
+
+
+def test_get_or_fetch_only_fetches_on_miss():
+    cache = TTLCache(ttl=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 'frame'
+
+    assert cache.get_or_fetch('curry', fetch) == 'frame'
+    assert cache.get_or_fetch('curry', fetch) == 'frame'
+    assert len(calls) == 1
+
+
+def test_delete():
+    cache = TTLCache(ttl=60)
+    cache.set('durant', 1)
+    cache.delete('durant')
+    cache.delete('missing')
+    assert 'durant' not in cache
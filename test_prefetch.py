@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytz
+
+import prefetch
+from playbyplay import is_game_end, _live_actions
+from prefetch import GameNightScheduler
+from stats import player_stats_cache, team_stats_cache, roster_cache
+from shotchart import shots_cache, render_cache
+
+AWAY_TEAM_ID = 1610612747
+HOME_TEAM_ID = 1610612744
+
+
+def make_game(start_in, status=1):
+    return {
+        'gameId': '0022300001',
+        'gameStatus': status,
+        'startTime': datetime.now(tz=pytz.utc) + timedelta(seconds=start_in),
+        'homeTeamId': HOME_TEAM_ID,
+        'awayTeamId': AWAY_TEAM_ID,
+        'matchup': 'Lakers vs Warriors',
+    }
+
+
+def test_is_game_end():
+    assert is_game_end({'actionType': 'game', 'subType': 'end', 'description': 'Game End'})
+    assert not is_game_end({'actionType': 'period', 'subType': 'end', 'description': 'Period End'})
+    assert not is_game_end({'actionType': '2pt', 'description': 'MADE Dunk'})
+
+
+def test_slow_prefetch_is_cut_off_at_tip_and_polling_starts_on_time(monkeypatch):
+    monkeypatch.setattr(prefetch, 'PREFETCH_LEAD', timedelta(seconds=10))
+    events = []
+
+    async def run():
+        scheduler = GameNightScheduler()
+
+        async def slow_prefetch(game):
+            events.append('prefetch')
+            await asyncio.sleep(60)
+            events.append('prefetch finished')
+
+        async def poll_live(game):
+            events.append(('poll', datetime.now(tz=pytz.utc) >= game['startTime']))
+
+        scheduler.prefetch = slow_prefetch
+        scheduler.poll_live = poll_live
+        await asyncio.wait_for(scheduler.game_night(make_game(start_in=0.2)), timeout=5)
+
+    asyncio.run(run())
+    assert events == ['prefetch', ('poll', True)]
+
+
+def test_failed_prefetch_still_polls(monkeypatch):
+    monkeypatch.setattr(prefetch, 'PREFETCH_LEAD', timedelta(seconds=10))
+    polled = []
+
+    async def run():
+        scheduler = GameNightScheduler()
+
+        async def broken_prefetch(game):
+            raise RuntimeError('name index unavailable')
+
+        async def poll_live(game):
+            polled.append(game['gameId'])
+
+        scheduler.prefetch = broken_prefetch
+        scheduler.poll_live = poll_live
+        await asyncio.wait_for(scheduler.game_night(make_game(start_in=0.1)), timeout=5)
+
+    asyncio.run(run())
+    assert polled == ['0022300001']
+
+
+def test_live_game_skips_prefetch():
+    events = []
+
+    async def run():
+        scheduler = GameNightScheduler()
+
+        async def prefetch_game(game):
+            events.append('prefetch')
+
+        async def poll_live(game):
+            events.append('poll')
+
+        scheduler.prefetch = prefetch_game
+        scheduler.poll_live = poll_live
+        await scheduler.game_night(make_game(start_in=-600, status=2))
+
+    asyncio.run(run())
+    assert events == ['poll']
+
+
+def test_polling_winds_down_after_final_and_evicts_caches(monkeypatch):
+    actions = [
+        {'actionNumber': 610, 'actionType': '2pt', 'description': 'MADE Layup'},
+        {'actionNumber': 615, 'actionType': 'game', 'subType': 'end', 'description': 'Game End'},
+    ]
+    polls = []
+
+    def fetch_game_actions(game_id):
+        polls.append(game_id)
+        return actions
+
+    monkeypatch.setattr(prefetch, 'fetch_game_actions', fetch_game_actions)
+    monkeypatch.setattr(prefetch, 'LIVE_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(prefetch, 'FINAL_WIND_DOWN', timedelta(seconds=0.1))
+
+    player_id = 2544
+    roster_cache.set(AWAY_TEAM_ID, [{'id': player_id, 'name': 'LeBron James'}])
+    team_stats_cache.set(AWAY_TEAM_ID, 'team frame')
+    player_stats_cache.set(player_id, 'player frames')
+    shots_cache.set(player_id, 'shots')
+    render_cache.set((player_id, 'regular'), b'png')
+    render_cache.set((player_id, 'heatmap'), b'png')
+
+    game = make_game(start_in=-600, status=2)
+    asyncio.run(asyncio.wait_for(GameNightScheduler().poll_live(game), timeout=5))
+
+    assert len(polls) > 1  # kept polling through the wind-down
+    assert game['gameId'] not in _live_actions
+    assert AWAY_TEAM_ID not in team_stats_cache
+    assert player_id not in player_stats_cache
+    assert player_id not in shots_cache
+    assert (player_id, 'regular') not in render_cache
+    assert (player_id, 'heatmap') not in render_cache
+    roster_cache.delete(AWAY_TEAM_ID)
+
+
+def test_polling_stops_after_max_game_length(monkeypatch):
+    monkeypatch.setattr(prefetch, 'fetch_game_actions', lambda game_id: [])
+    monkeypatch.setattr(prefetch, 'LIVE_POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(prefetch, 'MAX_GAME_LENGTH', timedelta(seconds=0.2))
+    asyncio.run(asyncio.wait_for(GameNightScheduler().poll_live(make_game(start_in=0)), timeout=5))
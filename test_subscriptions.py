@@ -0,0 +1,165 @@
+import asyncio
+import re
+
+import subscriptions
+from playbyplay import set_live_actions, clear_live_actions
+from subscriptions import SubscriptionStore, stream_play_by_play
+
+GAME_ID = '0022300001'
+CHANNEL_ID = 1234
+
+# recorded play-by-play for the opening minute of a game
+REPLAYED_ACTIONS = [
+    {'actionNumber': 2, 'period': 1, 'clock': 'PT12M00.00S', 'actionType': 'period', 'description': 'Period Start', 'personId': 0},
+    {'actionNumber': 4, 'period': 1, 'clock': 'PT11M58.00S', 'actionType': 'jumpball', 'description': 'Jump Ball', 'personId': 0},
+    {'actionNumber': 7, 'period': 1, 'clock': 'PT11M41.00S', 'actionType': '2pt', 'description': 'MISS Driving Layup', 'personId': 0},
+    {'actionNumber': 8, 'period': 1, 'clock': 'PT11M39.00S', 'actionType': 'rebound', 'description': 'DEF REBOUND', 'personId': 0},
+    {'actionNumber': 10, 'period': 1, 'clock': 'PT11M30.00S', 'actionType': '3pt', 'description': 'MADE 3PT Jump Shot', 'personId': 0},
+    {'actionNumber': 11, 'period': 1, 'clock': 'PT11M12.00S', 'actionType': 'foul', 'description': 'Personal Foul', 'personId': 0},
+    {'actionNumber': 13, 'period': 1, 'clock': 'PT11M12.00S', 'actionType': 'freethrow', 'description': 'Free Throw 1 of 2', 'personId': 0},
+    {'actionNumber': 14, 'period': 1, 'clock': 'PT11M12.00S', 'actionType': 'freethrow', 'description': 'Free Throw 2 of 2', 'personId': 0},
+    {'actionNumber': 16, 'period': 1, 'clock': 'PT10M55.00S', 'actionType': 'turnover', 'description': 'Bad Pass Turnover', 'personId': 0},
+    {'actionNumber': 18, 'period': 1, 'clock': 'PT10M40.00S', 'actionType': '2pt', 'description': 'MADE Dunk', 'personId': 0},
+]
+
+
+class ReplayedGame:
+    """Feeds REPLAYED_ACTIONS to the live play-by-play cache one play per send, like a game in progress"""
+
+    def __init__(self, released, sent_before_pause, on_send=None):
+        self.released = released
+        self.sent = []
+        self.paused = asyncio.Event()
+        self.sent_before_pause = sent_before_pause
+        self.on_send = on_send
+        set_live_actions(GAME_ID, REPLAYED_ACTIONS[:self.released])
+
+    def release_next(self):
+        self.released += 1
+        set_live_actions(GAME_ID, REPLAYED_ACTIONS[:self.released])
+
+    async def send(self, message):
+        match = re.match(r'`(\d+)`', message)
+        if match is None:
+            return
+        if self.on_send is not None:
+            self.on_send(len(self.sent))
+        self.sent.append(int(match.group(1)))
+        if len(self.sent) >= self.sent_before_pause:
+            self.paused.set()  # stop releasing plays, the stream idles until cancelled
+        else:
+            self.release_next()
+        await asyncio.sleep(0)
+
+
+async def run_until_paused(store, game, idle_poll=None):
+    stream = asyncio.create_task(stream_play_by_play(store, GAME_ID, CHANNEL_ID, game.send))
+    if idle_poll is not None:
+        # the feed holds nothing past the persisted cursor, so the first poll must come back empty
+        await asyncio.wait_for(idle_poll.wait(), timeout=10)
+        assert game.sent == []
+        game.release_next()
+    await asyncio.wait_for(game.paused.wait(), timeout=10)
+    stream.cancel()
+    try:
+        await stream
+    except asyncio.CancelledError:
+        pass
+
+
+def test_stream_resumes_from_persisted_cursor_after_hard_kill(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'subscriptions.db')
+    get_play_by_play = subscriptions.get_play_by_play
+
+    async def replay():
+        idle_poll = asyncio.Event()
+
+        async def watched_get_play_by_play(game_id, last_action_number):
+            plays, last_action_number = await get_play_by_play(game_id, last_action_number)
+            if not plays:
+                idle_poll.set()
+            return plays, last_action_number
+
+        monkeypatch.setattr(subscriptions, 'get_play_by_play', watched_get_play_by_play)
+        store = SubscriptionStore(db_path)
+        store.subscribe(GAME_ID, CHANNEL_ID)
+
+        def flush_after_three_plays(already_sent):
+            # stands in for run_flusher firing once mid-game, the cursor of play 3 is persisted
+            if already_sent == 3:
+                store.flush()
+
+        first_run = ReplayedGame(released=1, sent_before_pause=5, on_send=flush_after_three_plays)
+        await run_until_paused(store, first_run)
+        # hard kill: no close(), the cursors queued after the flush are lost
+        store._conn.close()
+
+        store = SubscriptionStore(db_path)
+        [(_, _, persisted_cursor)] = store.subscriptions()
+        # resume against the feed as of the persisted cursor, then let the game carry on
+        second_run = ReplayedGame(released=3, sent_before_pause=3)
+        idle_poll.clear()  # the killed run idled too, only count polls after the restart
+        await run_until_paused(store, second_run, idle_poll=idle_poll)
+        store.close()
+        return first_run.sent, persisted_cursor, second_run.sent
+
+    try:
+        first_sent, persisted_cursor, resumed_sent = asyncio.run(replay())
+    finally:
+        clear_live_actions(GAME_ID)
+
+    assert first_sent == [2, 4, 7, 8, 10]
+    assert persisted_cursor == 7
+    assert all(action_number > persisted_cursor for action_number in resumed_sent)
+    assert resumed_sent == [8, 10, 11]
+
+
+def test_stream_ends_and_unsubscribes_on_game_end(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subscriptions.db'))
+    store.subscribe(GAME_ID, CHANNEL_ID)
+    set_live_actions(GAME_ID, REPLAYED_ACTIONS + [
+        {'actionNumber': 620, 'period': 4, 'clock': 'PT00M00.00S', 'actionType': 'game', 'subType': 'end',
+         'description': 'Game End', 'personId': 0, 'scoreHome': '112', 'scoreAway': '108'},
+    ])
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    try:
+        asyncio.run(asyncio.wait_for(stream_play_by_play(store, GAME_ID, CHANNEL_ID, send), timeout=5))
+    finally:
+        clear_live_actions(GAME_ID)
+    subscriptions = store.subscriptions()
+    store.close()
+
+    assert messages[-1] == "Game ended! Final score: 108 - 112"
+    assert subscriptions == []
+
+
+def test_failed_send_keeps_subscription(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subscriptions.db'))
+    store.subscribe(GAME_ID, CHANNEL_ID)
+    set_live_actions(GAME_ID, REPLAYED_ACTIONS[:1])
+
+    async def send(message):
+        raise RuntimeError('Discord is down')
+
+    try:
+        asyncio.run(asyncio.wait_for(stream_play_by_play(store, GAME_ID, CHANNEL_ID, send), timeout=5))
+    finally:
+        clear_live_actions(GAME_ID)
+    subscriptions = store.subscriptions()
+    store.close()
+
+    assert subscriptions == [(GAME_ID, CHANNEL_ID, -1)]
+
+
+def test_games_older_than_retention_are_pruned(tmp_path):
+    store = SubscriptionStore(str(tmp_path / 'subscriptions.db'))
+    with store._conn:
+        store._conn.execute("INSERT INTO games VALUES ('old', 'A vs B', '07:00 PM PDT', 0)")
+    store.add_games([{'gameId': 'new', 'matchup': 'C vs D', 'time': '07:30 PM PDT'}])
+    rows = store._conn.execute("SELECT game_id FROM games").fetchall()
+    store.close()
+    assert rows == [('new',)]